@@ -1,12 +1,10 @@
 
 import os
 from typing import Optional
-import re  # NEW
-import glob  # NEW
+import hashlib
+import hmac
 
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
 
 # ---------------- Page config (robust to missing icon) ----------------
 
@@ -14,18 +12,36 @@ st.set_page_config(layout="wide", page_icon="GEM.webp")
 st.title("Average Monthly Generation and Capture Prices")
 
 # ---------------- Utilities ----------------
+try:
+    from decouple import config as decouple_config  # type: ignore
+except ImportError:
+    decouple_config = None
+
+@st.cache_resource
 def get_config_value(key: str, default: Optional[str] = None) -> Optional[str]:
     """
     Try python-decouple if available; fallback to environment variables.
+    Resolved once per process (the script body re-runs on every interaction).
     """
-    try:
-        from decouple import config as decouple_config  # type: ignore
-        return decouple_config(key, default=default)
-    except Exception:
-        return os.getenv(key, default)
+    if decouple_config is not None:
+        try:
+            return decouple_config(key, default=default)
+        except Exception:
+            pass
+    return os.getenv(key, default)
+
+@st.cache_resource
+def password_checker():
+    """
+    Salted digest of SECRET_PASSWORD, built once per process.
+    Returns (salt, digest); digest is None when no password is configured.
+    """
+    secret_password = get_config_value('SECRET_PASSWORD', '')
+    salt = os.urandom(16)
+    digest = hmac.new(salt, secret_password.encode(), hashlib.sha256).digest() if secret_password else None
+    return salt, digest
 
 stripe_link = get_config_value('STRIPE_CHECKOUT_LINK', '#')
-secret_password = get_config_value('SECRET_PASSWORD', '')
 
 # ---------------- Description / CTA ----------------
 st.markdown(
@@ -59,7 +75,9 @@ with st.form("login_form"):
     submitted = st.form_submit_button("Login")
 
 if submitted:
-    if secret_password and (password == secret_password):
+    salt, secret_hash = password_checker()
+    # Compare fixed-size digests in constant time instead of the plaintext strings
+    if secret_hash is not None and hmac.compare_digest(secret_hash, hmac.new(salt, password.encode(), hashlib.sha256).digest()):
         st.session_state['logged_in'] = True
         st.success('Successfully Logged In!')
     else:
@@ -72,26 +90,9 @@ if not is_logged_in:
     st.info("🔒 Please log in with the password above to access the charts.")
     st.stop()
 else:
-    # ---------------- Data Loading ----------------
-    @st.cache_data
-    def load_df(filepath: str):
-        return pd.read_csv(
-            filepath,
-            encoding="utf-8-sig",   # handles BOM safely
-            sep=",",                # your file is comma-separated
-            engine="python"
-        )
-
-    # ---- NEW: discover available years & let user pick a year ----
-    BASE_PREFIX = "Germany"  # change this if your prefix differs
-    def list_available_years(prefix: str = BASE_PREFIX):
-        years = []
-        for path in glob.glob(f"{prefix} *.csv"):
-            fname = os.path.basename(path)
-            m = re.match(rf"^{re.escape(prefix)}\s+(\d{{4}})\.csv$", fname)
-            if m:
-                years.append(int(m.group(1)))
-        return sorted(set(years))
+    # Plotting imports live behind the login gate so logged-out visits don't pay for them
+    from charts import monthly_figure
+    from data import BASE_PREFIX, column_options, list_available_years, monthly_stats, monthly_summary, summary_table
 
     available_years = list_available_years()
     if not available_years:
@@ -106,147 +107,34 @@ else:
     CSV_FILE = f"{BASE_PREFIX} {selected_year}.csv"  # UPDATED
 
     try:
-        df = load_df(CSV_FILE)
+        gen_sums, cap_sums = monthly_stats(CSV_FILE, selected_year)
     except Exception as e:
         st.error(f"Failed to load CSV '{CSV_FILE}': {e}")
         st.stop()
 
-    # ---------------- Cleaning / Preparation ----------------
-    # 0) Normalize column names (defensive against BOM/ZWSP/spaces)
-    df.columns = (
-        df.columns.astype(str)
-        .str.replace("\ufeff", "", regex=False)  # BOM
-        .str.replace("\u200b", "", regex=False)  # zero-width space
-        .str.strip()
-    )
-
-    # 1) Identify the date column as the first column (your CSV format)
-    date_col = df.columns[0]  # should be "Date (GMT+1)" or similar
-
-    # 2) Drop the units row if present (the row just after header)
-    if not df.empty:
-        first_row_str = df.iloc[0].astype(str).str.lower()
-        units_hits = first_row_str.str.contains(r"power\s*\(mw\)|price\s*\(", regex=True).mean()
-        if units_hits > 0.3:
-            df = df.iloc[1:].reset_index(drop=True)
-
-    # 3) Parse datetime robustly, accepting timezone (+01:00), then drop tz
-    s = df[date_col].astype(str).str.strip().replace({"": pd.NA})
-    df[date_col] = pd.to_datetime(s, errors="coerce", utc=True)
-    df = df[df[date_col].notna()].copy()
-    df[date_col] = df[date_col].dt.tz_convert("UTC").dt.tz_localize(None)
-
-    # 4) Month column
-    df["Month"] = df[date_col].dt.to_period("M").dt.to_timestamp()
-
-    # 5) Keep only months in selected year (UPDATED)
-    df_year = df[df["Month"].dt.year == selected_year].copy()
-    if df_year.empty:
+    # ---------------- Preparation ----------------
+    # Monthly sums for the selected year are precomputed for every series
+    if gen_sums.empty:
         st.warning(f"No data available for {selected_year} after filtering.")
         st.stop()
 
-    # 6) Try to locate the price column robustly
-    price_col = "Day Ahead Auction (DE-LU)"
-    if price_col not in df_year.columns:
-        alt = "Day-ahead Auction (DE-LU)"
-        if alt in df_year.columns:
-            price_col = alt
-        else:
-            possibles = [c for c in df_year.columns if "auction" in c.lower() and "de-lu" in c.lower()]
-            price_col = possibles[0] if possibles else None
-
-    # Build list of selectable energy columns (exclude date/month/price)
-    meta_cols = {date_col, "Month"}
-    exclude_cols = set(meta_cols)
-    if price_col is not None:
-        exclude_cols.add(price_col)
-    value_cols = [c for c in df_year.columns if c not in exclude_cols]
-
-    selected_col = st.selectbox("Select the column to analyze (energy series in MW):", options=sorted(value_cols))
-
-    # Ensure numeric
-    df_year[selected_col] = pd.to_numeric(df_year[selected_col], errors="coerce")
-    if price_col is not None:
-        df_year[price_col] = pd.to_numeric(df_year[price_col], errors="coerce")
+    # Selectable energy series (cached per file)
+    _, value_options = column_options(CSV_FILE)
 
-    # ---------------- Aggregations ----------------
-    # Monthly total energy (GWh): sum(MW) * 0.25h / 1000 = sum(MW) / 4000
-    monthly_gwh = df_year.groupby("Month", sort=True)[selected_col].sum() / 4000.0
+    selected_col = st.selectbox("Select the column to analyze (energy series in MW):", options=value_options)
 
-    # Capture value (M€ / month): sum(MW * EUR/MWh * 0.25) / 1e6 = sum(MW*Price)/4_000_000
-    if price_col is None:
+    # ---------------- Aggregations ----------------
+    summary = monthly_summary(gen_sums, cap_sums, selected_col)
+    if cap_sums is None:
         st.warning("Price column 'Day Ahead Auction (DE-LU)' not found; skipping Capture calculations.")
-        capture_meur = pd.Series(dtype=float)
-        capture_price_eur_per_mwh = pd.Series(dtype=float)
-    else:
-        capture_meur = (df_year[selected_col] * df_year[price_col]).groupby(df_year["Month"]).sum() / 4_000_000.0
-
-        # Capture Price (€/MWh) = (Monthly Capture M€ / Monthly Production GWh) * 1000
-        common_index = monthly_gwh.index.intersection(capture_meur.index)
-        monthly_gwh_aligned = monthly_gwh.reindex(common_index)
-        capture_meur_aligned = capture_meur.reindex(common_index)
-
-        with pd.option_context("mode.use_inf_as_na", True):
-            capture_price_eur_per_mwh = (capture_meur_aligned / monthly_gwh_aligned) * 1000.0
-            capture_price_eur_per_mwh = capture_price_eur_per_mwh.replace([pd.NA], 0).fillna(0)
 
     # ---------------- Plots: all in subplots ----------------
-    # Prepare x labels once
-    def _labels(idx):
-        try:
-            return idx.strftime("%Y-%m")
-        except Exception:
-            return idx.astype(str)
-
-    # Create a single figure with 3 rows of subplots
-    fig, axes = plt.subplots(nrows=3, ncols=1, figsize=(14, 12), sharex=True)
-    plt.subplots_adjust(hspace=0.35)
-
-    # Subplot 1: Monthly Total Energy (GWh)
-    ax = axes[0]
-    x1 = _labels(monthly_gwh.index)
-    ax.bar(x1, monthly_gwh.values, color="#2E86DE", edgecolor="#1B4F72")
-    ax.set_title(f"Monthly Total Energy – {selected_col} ({selected_year})", fontsize=14, pad=12)  # UPDATED
-    ax.set_ylabel("Energy (GWh)", fontsize=12)
-    ax.grid(axis="y", linestyle="--", alpha=0.4)
-
-    # Subplot 2: Monthly Capture Value (M€)
-    ax = axes[1]
-    if not capture_meur.empty:
-        x2 = _labels(capture_meur.index)
-        ax.bar(x2, capture_meur.values, color="#27AE60", edgecolor="#145A32")
-        ax.set_title(f"Monthly Capture Value – {selected_col} × {price_col} ({selected_year})", fontsize=14, pad=12)  # UPDATED
-        ax.set_ylabel("Capture (M€)", fontsize=12)
-        ax.grid(axis="y", linestyle="--", alpha=0.4)
-    else:
-        ax.text(0.5, 0.5, "Price column not found – capture value unavailable", ha="center", va="center", transform=ax.transAxes)
-        ax.axis("off")
-
-    # Subplot 3: Monthly Capture Price (€/MWh)
-    ax = axes[2]
-    if not capture_meur.empty and not capture_price_eur_per_mwh.empty:
-        x3 = _labels(capture_price_eur_per_mwh.index)
-        ax.bar(x3, capture_price_eur_per_mwh.values, color="#8E44AD", edgecolor="#4A235A")
-        ax.set_title(f"Monthly Capture Price – {selected_col} ({selected_year})", fontsize=14, pad=12)  # UPDATED
-        ax.set_xlabel("Month (YYYY-MM)", fontsize=12)
-        ax.set_ylabel("Capture Price (€/MWh)", fontsize=12)
-        ax.grid(axis="y", linestyle="--", alpha=0.4)
-        plt.setp(ax.get_xticklabels(), rotation=45, ha="right")
-    else:
-        ax.text(0.5, 0.5, "Price column not found – capture price unavailable", ha="center", va="center", transform=ax.transAxes)
-        ax.axis("off")
-
-    st.pyplot(fig, use_container_width=True)
+    # Cached per (file, year, series) and rendered client-side by Plotly
+    st.plotly_chart(monthly_figure(CSV_FILE, selected_year, selected_col), width="stretch")
 
     # ---------------- Raw data at the end only ----------------
     with st.expander("Show raw aggregated data (click to expand)"):
-        out = pd.DataFrame(index=monthly_gwh.index)
-        out["Monthly Energy (GWh)"] = monthly_gwh.round(3)
-        if not capture_meur.empty:
-            out["Monthly Capture (M€)"] = capture_meur.reindex(out.index).round(3)
-        if not capture_price_eur_per_mwh.empty:
-            out["Monthly Capture Price (€/MWh)"] = capture_price_eur_per_mwh.reindex(out.index).round(2)
-        st.dataframe(out)
+        st.dataframe(summary_table(summary), hide_index=True)
 
 
 
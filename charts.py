@@ -0,0 +1,57 @@
+"""
+The three-panel monthly Plotly figure shown by App.py and the free app.
+"""
+import streamlit as st
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+from data import column_options, monthly_stats, monthly_summary
+
+
+# Built once per (file, year, series): reruns that don't change the selection
+# (expander toggles, login reruns) reuse the figure instead of re-validating
+# every trace. Treat the returned figure as read-only.
+@st.cache_resource
+def monthly_figure(filepath: str, year: int, column: str):
+    gen_sums, cap_sums = monthly_stats(filepath, year)
+    price_col, _ = column_options(filepath)
+    summary = monthly_summary(gen_sums, cap_sums, column)
+    month_labels = summary["Month"]
+    has_capture = "Monthly Capture (M€)" in summary
+
+    # Create a single figure with 3 rows of subplots (rendered client-side by Plotly)
+    fig = make_subplots(
+        rows=3, cols=1, shared_xaxes=True, vertical_spacing=0.08,
+        subplot_titles=(
+            f"Monthly Total Energy – {column} ({year})",
+            f"Monthly Capture Value – {column} × {price_col} ({year})" if has_capture else "",
+            f"Monthly Capture Price – {column} ({year})" if has_capture else "",
+        ),
+    )
+
+    # Subplot 1: Monthly Total Energy (GWh)
+    fig.add_trace(go.Bar(x=month_labels, y=summary["Monthly Energy (GWh)"], marker=dict(color="#2E86DE", line=dict(color="#1B4F72", width=1))), row=1, col=1)
+    fig.update_yaxes(title_text="Energy (GWh)", row=1, col=1)
+
+    # Subplot 2: Monthly Capture Value (M€)
+    if has_capture:
+        fig.add_trace(go.Bar(x=month_labels, y=summary["Monthly Capture (M€)"], marker=dict(color="#27AE60", line=dict(color="#145A32", width=1))), row=2, col=1)
+        fig.update_yaxes(title_text="Capture (M€)", row=2, col=1)
+    else:
+        fig.add_annotation(text="Price column not found – capture value unavailable", xref="x2 domain", yref="y2 domain", x=0.5, y=0.5, showarrow=False)
+        fig.update_xaxes(visible=False, row=2, col=1)
+        fig.update_yaxes(visible=False, row=2, col=1)
+
+    # Subplot 3: Monthly Capture Price (€/MWh)
+    if has_capture:
+        fig.add_trace(go.Bar(x=month_labels, y=summary["Monthly Capture Price (€/MWh)"], marker=dict(color="#8E44AD", line=dict(color="#4A235A", width=1))), row=3, col=1)
+        fig.update_xaxes(title_text="Month (YYYY-MM)", tickangle=-45, row=3, col=1)
+        fig.update_yaxes(title_text="Capture Price (€/MWh)", row=3, col=1)
+    else:
+        fig.add_annotation(text="Price column not found – capture price unavailable", xref="x3 domain", yref="y3 domain", x=0.5, y=0.5, showarrow=False)
+        fig.update_xaxes(visible=False, row=3, col=1)
+        fig.update_yaxes(visible=False, row=3, col=1)
+
+    fig.update_yaxes(showgrid=True, griddash="dash")
+    fig.update_layout(height=900, showlegend=False, bargap=0.2)
+    return fig
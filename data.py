@@ -0,0 +1,225 @@
+"""
+Loading and monthly aggregation of the energy-charts CSV exports, shared by
+App.py and the free app so both hit the same Streamlit cache entries.
+"""
+import os
+import csv
+import threading
+
+import streamlit as st
+import pandas as pd
+import numpy as np
+import pyarrow as pa
+
+# ---------------- Data Loading ----------------
+# Bump when the cleaned frame written to the Parquet sidecar changes shape.
+PARQUET_CACHE_VERSION = 4
+
+# Stripped from header names (defensive against BOM/ZWSP)
+HEADER_JUNK = str.maketrans("", "", "\ufeff\u200b")  # BOM, zero-width space
+
+# cache_resource hands every caller the same frame without pickling a copy;
+# treat it as read-only (callers only slice it).
+@st.cache_resource
+def load_df(filepath: str):
+    # Cleaned frames are cached as a Parquet sidecar next to the CSV, so the CSV
+    # parse and the cleaning below only run once per file version.
+    pq_path = f"{filepath}.v{PARQUET_CACHE_VERSION}.parquet"
+    if os.path.exists(pq_path) and os.path.getmtime(pq_path) >= os.path.getmtime(filepath):
+        try:
+            return pd.read_parquet(pq_path, engine="pyarrow")
+        except (OSError, pa.ArrowInvalid):
+            pass  # unreadable sidecar: re-parse the CSV below, which rewrites it
+
+    # Sniff the header and the row below it: energy-charts exports put a units
+    # row ("Power (MW)", "Price (EUR/MWh)") right after the header, which would
+    # turn every column into strings. Skip it at read time instead of post-load.
+    with open(filepath, encoding="utf-8-sig", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        second = next(reader, [])
+    hits = sum(("(mw)" in c.lower()) or ("price (" in c.lower()) for c in second)
+    has_units_row = bool(second) and hits / len(second) > 0.3
+
+    # Normalize the ~20 header names once, before they become DataFrame columns
+    header = [c.translate(HEADER_JUNK).strip() for c in header]
+
+    read_kwargs = dict(
+        filepath_or_buffer=filepath,
+        encoding="utf-8-sig",   # handles BOM safely
+        sep=",",
+        engine="pyarrow",       # multi-threaded C++ tokenizer
+        header=None,
+        names=header,
+        skiprows=2 if has_units_row else 1,
+    )
+    try:
+        # Typed read: value columns land directly as float32
+        df = pd.read_csv(**read_kwargs, dtype={c: "float32" for c in header[1:]})
+    except ValueError:
+        # Stray non-numeric cells: read untyped and coerce below
+        df = pd.read_csv(**read_kwargs)
+
+    # ---------------- Cleaning / Preparation ----------------
+    # 1) Identify the date column as the first column (your CSV format)
+    date_col = df.columns[0]  # should be "Date (GMT+1)" or similar
+
+    # 2) Parse datetime robustly, accepting timezone (+01:00), then drop tz
+    # (pyarrow usually hands back parsed timestamps already; strings are parsed with
+    # the fixed energy-charts format, and cache=True dedups repeated values)
+    df[date_col] = pd.to_datetime(
+        df[date_col], format="%Y-%m-%dT%H:%M%z", errors="coerce", utc=True, cache=True
+    )
+    df.dropna(subset=[date_col], inplace=True)
+    df[date_col] = df[date_col].dt.tz_localize(None)
+
+    # 3) Coerce value columns to float32 (the typed read has usually done it already)
+    to_fix = [c for c in df.columns[1:] if df[c].dtype != np.float32]
+    if to_fix:
+        df[to_fix] = df[to_fix].apply(pd.to_numeric, errors="coerce").astype("float32")
+
+    # 4) Month column (numpy month-floor; no PeriodArray round-trip)
+    df["Month"] = df[date_col].to_numpy().astype("datetime64[M]").astype("datetime64[ns]")
+
+    # Write to a temp file in the same folder and rename it into place, so a crash
+    # or a second app writing concurrently never leaves a partial sidecar behind.
+    # The name is unique per process/thread and opened normally, so the sidecar keeps
+    # umask permissions (mkstemp's 0600 would lock out an app running as another user).
+    tmp_path = f"{pq_path}.{os.getpid()}-{threading.get_ident()}.tmp.parquet"
+    try:
+        df.to_parquet(tmp_path, engine="pyarrow", compression="zstd")
+        os.replace(tmp_path, pq_path)
+    except OSError:
+        # read-only checkout: the in-memory cache still applies
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return df
+
+@st.cache_data
+def column_options(filepath: str):
+    """
+    Resolve the day-ahead price column and the sorted tuple of selectable
+    energy series for a file. Both are static per file, so reruns skip the
+    scan and the sort.
+    """
+    columns = load_df(filepath).columns
+    date_col = columns[0]
+
+    # Locate the price column robustly: exact names first, then any DE-LU auction
+    col_lookup = {c.lower(): c for c in columns}
+    price_col = (
+        col_lookup.get("day ahead auction (de-lu)")
+        or col_lookup.get("day-ahead auction (de-lu)")
+        or next((c for lc, c in col_lookup.items() if "auction" in lc and "de-lu" in lc), None)
+    )
+
+    # Selectable energy columns exclude date/Month/price
+    exclude_cols = {date_col, "Month", price_col}
+    return price_col, tuple(sorted(c for c in columns if c not in exclude_cols))
+
+@st.cache_data
+def monthly_stats(filepath: str, year: int):
+    """
+    Monthly sums of every selectable series for one year: MW sums and, when a
+    price column exists, MW x price sums. Switching the selected series is then
+    a column lookup instead of a fresh reduction over the quarter-hours.
+    """
+    df = load_df(filepath)
+    price_col, value_options = column_options(filepath)
+    if not df["Month"].is_monotonic_increasing:
+        df = df.sort_values("Month", kind="stable")
+
+    # With Month sorted the year is one contiguous block: bisect for its bounds
+    # and slice, rather than masking every row through .dt.year and copying.
+    months = df["Month"].to_numpy()
+    bounds = np.array([f"{year}-01", f"{year + 1}-01"], dtype="datetime64[ns]")
+    lo, hi = np.searchsorted(months, bounds)
+    df = df.iloc[lo:hi]
+    months = months[lo:hi]
+
+    # Rows are chronological, so each month is one contiguous run: reduce the
+    # runs with np.add.reduceat instead of building a hash-based grouper.
+    starts = np.flatnonzero(np.r_[True, months[1:] != months[:-1]]) if len(months) else np.empty(0, dtype=np.intp)
+    index = pd.DatetimeIndex(months[starts], name="Month")
+
+    def run_sums(values):
+        if not len(starts):
+            return pd.DataFrame(columns=value_options, index=index, dtype="float64")
+        # Zero out missing cells first: reduceat would carry a NaN into the whole
+        # month, where groupby().sum() skipped it
+        values = np.where(np.isnan(values), 0, values)
+        # float64 accumulator: the float32 inputs are summed without drift
+        sums = np.add.reduceat(values, starts, axis=0, dtype=np.float64)
+        return pd.DataFrame(sums, index=index, columns=value_options)
+
+    values = df[list(value_options)].to_numpy()
+    gen = run_sums(values)
+    if price_col is None:
+        return gen, None
+    cap = run_sums(values * df[price_col].to_numpy()[:, None])
+    return gen, cap
+
+def capture_series(gen_sums, cap_sums, column: str):
+    """
+    Monthly energy (GWh), capture value (M€) and capture price (€/MWh) of one
+    series, from the monthly_stats() sums. Without a price column the two
+    capture series come back empty.
+    """
+    # Monthly total energy (GWh): sum(MW) * 0.25h / 1000 = sum(MW) / 4000
+    # Capture value (M€ / month): sum(MW * EUR/MWh * 0.25) / 1e6 = sum(MW*Price)/4_000_000
+    monthly_gwh = gen_sums[column] / 4000.0
+    if cap_sums is None:
+        return monthly_gwh, pd.Series(dtype=float), pd.Series(dtype=float)
+    capture_meur = cap_sums[column] / 4_000_000.0
+
+    # Capture Price (€/MWh) = (Monthly Capture M€ / Monthly Production GWh) * 1000
+    # (cap / 4e6) / (gen / 4000) * 1000 folds to cap / gen: one division on the
+    # raw monthly sums. Months with zero production (inf/NaN) are reported as 0.
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cp = cap_sums[column].to_numpy() / gen_sums[column].to_numpy()
+    cp[~np.isfinite(cp)] = 0.0
+    return monthly_gwh, capture_meur, pd.Series(cp, index=monthly_gwh.index)
+
+# Summary table columns and the decimals they are shown with
+SUMMARY_DECIMALS = {
+    "Monthly Energy (GWh)": 3,
+    "Monthly Capture (M€)": 3,
+    "Monthly Capture Price (€/MWh)": 2,
+}
+
+def monthly_summary(gen_sums, cap_sums, column: str):
+    """
+    Month labels and the monthly figures of one series, keyed by their summary
+    table column names. The capture columns are left out without a price column.
+    """
+    monthly_gwh, capture_meur, capture_price_eur_per_mwh = capture_series(gen_sums, cap_sums, column)
+    # All series share monthly_stats()'s DatetimeIndex: format the labels once
+    summary = {"Month": monthly_gwh.index.strftime("%Y-%m"), "Monthly Energy (GWh)": monthly_gwh.to_numpy()}
+    if not capture_meur.empty:
+        summary["Monthly Capture (M€)"] = capture_meur.to_numpy()
+        summary["Monthly Capture Price (€/MWh)"] = capture_price_eur_per_mwh.to_numpy()
+    return summary
+
+def summary_table(summary):
+    # 12-row Arrow table built straight from the arrays (no pandas -> Arrow pass)
+    return pa.table({
+        name: np.round(values, SUMMARY_DECIMALS[name]) if name in SUMMARY_DECIMALS else values
+        for name, values in summary.items()
+    })
+
+# ---------------- Year discovery ----------------
+BASE_PREFIX = "Germany"  # change this if your prefix differs
+
+@st.cache_data(ttl=300)
+def list_available_years(prefix: str = BASE_PREFIX):
+    # One directory scan, no glob/regex; re-scanned at most every 5 minutes
+    head = f"{prefix} "
+    years = []
+    with os.scandir(".") as it:
+        for entry in it:
+            name = entry.name
+            if name.startswith(head) and name.endswith(".csv") and entry.is_file():
+                year = name[len(head):-4]
+                if len(year) == 4 and year.isdigit():
+                    years.append(int(year))
+    return sorted(set(years))